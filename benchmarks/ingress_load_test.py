@@ -0,0 +1,144 @@
+"""
+Load test for the /api/messages ingress.
+
+Posts synthetic Teams message activities to a locally running app at a fixed
+request rate and reports how long each webhook took to be acknowledged.
+
+    python src/app.py
+    python benchmarks/ingress_load_test.py --rate 500 --duration 10
+
+Use --duplicates to resend a share of activities with an id that was already
+posted, the way the Bot Framework does when it retries a webhook.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List
+
+import aiohttp
+
+
+def build_activity(activity_id: str) -> dict:
+    return {
+        "type": "message",
+        "id": activity_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "channelId": "msteams",
+        "serviceUrl": "http://localhost:9/",
+        "from": {
+            "id": "29:load-test-user",
+            "name": "Load Test",
+            "aadObjectId": "00000000-0000-0000-0000-000000000000",
+        },
+        "conversation": {
+            "id": "a:load-test-conversation",
+            "conversationType": "personal",
+        },
+        "recipient": {"id": "28:load-test-bot", "name": "Operator"},
+        # Deliberately not an "operator: " command so no browser agent starts
+        "text": "load test",
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def post_activity(
+    session: aiohttp.ClientSession,
+    url: str,
+    activity: dict,
+    latencies: List[float],
+    statuses: Counter,
+) -> None:
+    start = time.perf_counter()
+    try:
+        async with session.post(url, json=activity) as res:
+            await res.read()
+            statuses[res.status] += 1
+    except aiohttp.ClientError as e:
+        statuses[type(e).__name__] += 1
+        return
+    latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(args: argparse.Namespace) -> None:
+    total = int(args.rate * args.duration)
+    interval = 1 / args.rate
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    sent_ids: List[str] = []
+
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = []
+        started = time.perf_counter()
+        for i in range(total):
+            if sent_ids and random.random() < args.duplicates:
+                activity_id = random.choice(sent_ids)
+            else:
+                activity_id = str(uuid.uuid4())
+                sent_ids.append(activity_id)
+
+            tasks.append(
+                asyncio.create_task(
+                    post_activity(
+                        session,
+                        args.url,
+                        build_activity(activity_id),
+                        latencies,
+                        statuses,
+                    )
+                )
+            )
+
+            # Pace against the schedule rather than sleeping a fixed interval,
+            # so slow acks don't lower the offered rate
+            delay = started + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    print(f"Sent {total} activities in {elapsed:.2f}s ({total / elapsed:.0f} req/s)")
+    print(f"Unique activity ids: {len(sent_ids)}")
+    print("Status codes: " + ", ".join(f"{k}={v}" for k, v in statuses.items()))
+    if latencies:
+        print(
+            "Ack latency (ms): "
+            f"mean={statistics.mean(latencies):.1f} "
+            f"p50={percentile(latencies, 50):.1f} "
+            f"p95={percentile(latencies, 95):.1f} "
+            f"p99={percentile(latencies, 99):.1f} "
+            f"max={max(latencies):.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:3978/api/messages")
+    parser.add_argument("--rate", type=float, default=200, help="requests/second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument(
+        "--connections", type=int, default=100, help="max open connections"
+    )
+    parser.add_argument(
+        "--duplicates",
+        type=float,
+        default=0.1,
+        help="share of requests that reuse an earlier activity id",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark for the viewer protocol.
+
+Encodes the same synthetic step with every supported protocol version, the way
+it goes over the wire as a socket.io "message" event, and reports the payload
+size and serialization time per step. The v2 time includes decoding the
+screenshot from base64.
+
+    python benchmarks/viewer_protocol_benchmark.py --screenshot-kb 200
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+
+from socketio import packet
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from browser.session import SessionStepState
+from viewer_protocol import SUPPORTED_PROTOCOL_VERSIONS, encode_step
+
+
+def build_step(screenshot_kb: int) -> SessionStepState:
+    return SessionStepState(
+        # Random bytes stand in for a PNG, which is already compressed
+        screenshot=base64.b64encode(os.urandom(screenshot_kb * 1024)).decode(),
+        action="Success - navigated to the search results page",
+        memory="Searched for flights to Seattle, 3 results so far",
+        next_goal="Open the cheapest result",
+        actions=['{"click_element":{"index":12}}', '{"scroll_down":{}}'],
+    )
+
+
+def serialize(step: SessionStepState, version: int):
+    return packet.Packet(
+        packet.EVENT, data=["message", encode_step(step, version)]
+    ).encode()
+
+
+def wire_size(encoded) -> int:
+    # Binary packets encode to a header string followed by raw attachments
+    if isinstance(encoded, list):
+        return len(encoded[0].encode()) + sum(len(part) for part in encoded[1:])
+    return len(encoded.encode())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--screenshot-kb", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    step = build_step(args.screenshot_kb)
+    print(
+        f"Screenshot: {args.screenshot_kb} KiB raw, "
+        f"{len(step.screenshot) / 1024:.0f} KiB base64"
+    )
+
+    results = {}
+    for version in SUPPORTED_PROTOCOL_VERSIONS:
+        size = wire_size(serialize(step, version))
+        elapsed = 0.0
+        for _ in range(args.iterations):
+            # Time the first send of a step, which for v2 includes decoding
+            # the screenshot. Later sends reuse the decoded bytes.
+            step._screenshot_bytes = None
+            start = time.perf_counter()
+            serialize(step, version)
+            elapsed += time.perf_counter() - start
+        per_step = elapsed / args.iterations
+        results[version] = (size, per_step)
+
+    baseline_size, baseline_time = results[min(results)]
+    for version, (size, per_step) in results.items():
+        print(
+            f"v{version}: {size / 1024:8.1f} KiB/step "
+            f"({size / baseline_size:6.1%} of v{min(results)}), "
+            f"{per_step * 1e6:8.1f} us/step "
+            f"({per_step / baseline_time:6.1%} of v{min(results)})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from botbuilder.schema import Activity
+from botframework.connector.auth import AuthenticateRequestResult
+
+logger = logging.getLogger(__name__)
+
+ActivityHandler = Callable[[AuthenticateRequestResult, Activity], Awaitable[None]]
+QueuedActivity = Tuple[AuthenticateRequestResult, Activity]
+
+
+class ActivityQueue:
+    """Buffers inbound activities so the webhook can be acknowledged right away.
+
+    Activities are processed by a fixed pool of workers. Retries of an activity
+    that was already accepted within `dedup_window` seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        handler: ActivityHandler,
+        workers: int = 4,
+        max_size: int = 1000,
+        dedup_window: float = 300.0,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.dedup_window = dedup_window
+        self._queue: asyncio.Queue[QueuedActivity] = asyncio.Queue(maxsize=max_size)
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def _dedup_key(activity: Activity) -> Optional[str]:
+        if not activity.id:
+            return None
+        conversation_id = activity.conversation.id if activity.conversation else ""
+        return f"{conversation_id}:{activity.id}"
+
+    def _prune_seen(self, now: float) -> None:
+        # Entries are inserted in expiry order, so expired ones sit at the front
+        while self._seen:
+            key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            del self._seen[key]
+
+    def enqueue(
+        self, auth_result: AuthenticateRequestResult, activity: Activity
+    ) -> bool:
+        """Queue an already authenticated activity for processing.
+
+        Returns False if the activity is a duplicate and was dropped. Raises
+        asyncio.QueueFull if the queue has no room for it.
+        """
+        now = time.monotonic()
+        self._prune_seen(now)
+
+        key = self._dedup_key(activity)
+        if key is not None and key in self._seen:
+            logger.debug("Dropping duplicate activity %s", key)
+            return False
+
+        self._queue.put_nowait((auth_result, activity))
+        if key is not None:
+            self._seen[key] = now + self.dedup_window
+        return True
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def _worker(self) -> None:
+        while True:
+            auth_result, activity = await self._queue.get()
+            try:
+                await self.handler(auth_result, activity)
+            except Exception:
+                logger.exception("Failed to process activity %s", activity.id)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued activities a chance to drain, then stop the workers"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Stopping with %d activities still queued", self._queue.qsize()
+            )
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -3,23 +3,47 @@ Copyright (c) Microsoft Corporation. All rights reserved.
 Licensed under the MIT License.
 """
 
+import asyncio
+import hmac
+import math
 import os
 from http import HTTPStatus
 from typing import Awaitable, Callable
 
-import socketio
 from aiohttp import web
 from botbuilder.core import TurnContext
 from botbuilder.core.integration import aiohttp_error_middleware
 from botbuilder.core.middleware_set import Middleware
+from botbuilder.schema import Activity, ActivityTypes, DeliveryModes
+from botframework.connector.auth import AuthenticateRequestResult
 
+from activity_queue import ActivityQueue
 from bot import bot_app
-from bot_web_sync import BotWebSync
+from bot_web_sync import BotWebSync, ScopedSocket
+from config import Config
+from diagnostics import LoopLagWatchdog, sample_stacks
 from storage.in_memory_session_storage import InMemorySessionStorage
+from viewer_protocol import encode_state
 
 routes = web.RouteTableDef()
 web_sync = BotWebSync()
 session_storage = InMemorySessionStorage()
+loop_watchdog = LoopLagWatchdog(threshold=Config.LOOP_LAG_THRESHOLD_MS / 1000)
+profile_lock = asyncio.Lock()
+
+
+async def process_queued_activity(
+    auth_result: AuthenticateRequestResult, activity: Activity
+):
+    await bot_app._adapter.process_activity(auth_result, activity, bot_app.on_turn)
+
+
+activity_queue = ActivityQueue(
+    process_queued_activity,
+    workers=Config.INBOUND_WORKERS,
+    max_size=Config.INBOUND_QUEUE_SIZE,
+    dedup_window=Config.INBOUND_DEDUP_WINDOW,
+)
 
 # Get the absolute path to the static directory
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
@@ -32,10 +56,38 @@ print(
 
 @routes.post("/api/messages")
 async def on_messages(req: web.Request) -> web.Response:
-    res = await bot_app.process(req)
-
-    if res is not None:
-        return res
+    if "application/json" not in req.headers.get("Content-Type", ""):
+        return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+    activity = Activity().deserialize(await req.json())
+    if not activity.type:
+        return web.Response(status=HTTPStatus.BAD_REQUEST)
+
+    # Invokes and expectReplies carry their result in the HTTP response,
+    # so they have to be processed inline
+    if (
+        activity.type == ActivityTypes.invoke
+        or activity.delivery_mode == DeliveryModes.expect_replies
+    ):
+        res = await bot_app.process(req)
+        if res is not None:
+            return res
+        return web.Response(status=HTTPStatus.OK)
+
+    # Authenticate before queueing so unauthenticated callers can't take
+    # queue or de-duplication slots. A PermissionError here is turned into a
+    # 401 by aiohttp_error_middleware.
+    authentication = bot_app._adapter.bot_framework_authentication
+    auth_result = await authentication.authenticate_request(
+        activity, req.headers.get("Authorization", "")
+    )
+
+    # Everything else is acknowledged immediately so slow turns don't make
+    # the Bot Framework retry the webhook
+    try:
+        activity_queue.enqueue(auth_result, activity)
+    except asyncio.QueueFull:
+        return web.Response(status=HTTPStatus.SERVICE_UNAVAILABLE)
 
     return web.Response(status=HTTPStatus.OK)
 
@@ -59,9 +111,52 @@ async def serve_index(request):
         return web.Response(text="Error reading index file", status=500)
 
 
-@routes.get("/debug")
-async def debug(request):
-    return web.Response(text="Debug route working")
+def is_debug_authorized(request: web.Request) -> bool:
+    if not Config.DEBUG_TOKEN:
+        return False
+    # Header only: tokens in query strings end up in access and proxy logs
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return False
+    token = auth_header[len("Bearer ") :]
+    return hmac.compare_digest(token.encode(), Config.DEBUG_TOKEN.encode())
+
+
+@routes.get("/debug/profile")
+async def debug_profile(request: web.Request) -> web.Response:
+    # Pretend the route doesn't exist unless a valid DEBUG_TOKEN is supplied
+    if not is_debug_authorized(request):
+        return web.Response(status=HTTPStatus.NOT_FOUND)
+
+    try:
+        seconds = float(request.query.get("seconds", "5"))
+        interval_ms = float(
+            request.query.get("interval_ms", str(Config.PROFILE_MIN_INTERVAL_MS))
+        )
+        # nan and inf would slip through the clamps below
+        if not (math.isfinite(seconds) and math.isfinite(interval_ms)):
+            raise ValueError
+    except ValueError:
+        return web.Response(text="Invalid seconds or interval_ms", status=400)
+    seconds = min(max(seconds, 0.1), Config.PROFILE_MAX_SECONDS)
+    interval_ms = min(
+        max(interval_ms, Config.PROFILE_MIN_INTERVAL_MS), seconds * 1000
+    )
+
+    if profile_lock.locked():
+        return web.Response(text="A profile is already running", status=409)
+
+    async with profile_lock:
+        profile = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+
+    return web.Response(
+        text=profile,
+        content_type="text/plain",
+        headers={
+            "Content-Disposition": 'attachment; filename="profile.collapsed"',
+            "X-Loop-Lag-Max-Ms": f"{loop_watchdog.max_lag * 1000:.0f}",
+        },
+    )
 
 
 # Create the application with static file handling
@@ -72,25 +167,13 @@ app.router.add_static("/static/", path=STATIC_DIR, name="static", show_index=Tru
 app.add_routes(routes)
 
 
-async def on_socket_connection(user_id: str, socket: socketio.AsyncServer):
+async def on_socket_connection(user_id: str, socket: ScopedSocket):
     print("connection", user_id)
     session = session_storage.get_or_create_session(user_id)
 
-    # Convert session state to message format expected by frontend
-    messages = []
-    if hasattr(session, "session_state"):
-        messages = [
-            {
-                "screenshot": state.screenshot,
-                "action": state.action,
-                "memory": state.memory,
-                "next_goal": state.next_goal,
-                "actions": state.actions,
-            }
-            for state in session.session_state
-        ]
-
-    await socket.emit("initializeState", {"messages": messages})
+    # Convert session state to the format negotiated by the frontend
+    steps = session.session_state if hasattr(session, "session_state") else []
+    await socket.emit("initializeState", encode_state(steps, socket.protocol))
 
 
 async def on_socket_message(user_id: str, context: TurnContext, message: str):
@@ -113,8 +196,6 @@ class BuildStateMiddleware(Middleware):
 
 bot_app._adapter.use(BuildStateMiddleware())
 
-from config import Config
-
 
 async def start_websocket(app: web.Application):
     await web_sync.listen(app, bot_app._adapter)
@@ -122,7 +203,27 @@ async def start_websocket(app: web.Application):
     web_sync.on("message", on_socket_message)
 
 
+async def start_activity_queue(app: web.Application):
+    activity_queue.start()
+
+
+async def stop_activity_queue(app: web.Application):
+    await activity_queue.stop()
+
+
+async def start_loop_watchdog(app: web.Application):
+    loop_watchdog.start()
+
+
+async def stop_loop_watchdog(app: web.Application):
+    await loop_watchdog.stop()
+
+
 app.on_startup.append(start_websocket)
+app.on_startup.append(start_activity_queue)
+app.on_startup.append(start_loop_watchdog)
+app.on_cleanup.append(stop_activity_queue)
+app.on_cleanup.append(stop_loop_watchdog)
 
 if __name__ == "__main__":
     web.run_app(app, host="0.0.0.0", port=Config.PORT)
@@ -10,16 +10,24 @@ from botbuilder.core.middleware_set import Middleware
 from botbuilder.schema import ConversationReference
 from teams import TeamsAdapter
 
+from viewer_protocol import LEGACY_PROTOCOL_VERSION, negotiate
+
 logger = logging.getLogger(__name__)
 
-ConnectionCallback = Callable[[str, socketio.AsyncServer], Union[None, Awaitable[None]]]
+ConnectionCallback = Callable[[str, "ScopedSocket"], Union[None, Awaitable[None]]]
 WebSyncCallback = Callable[[str, Optional[TurnContext], Any], None]
 
 
 class ScopedSocket:
-    def __init__(self, io: socketio.AsyncServer, sid: str):
+    def __init__(
+        self,
+        io: socketio.AsyncServer,
+        sid: str,
+        protocol: int = LEGACY_PROTOCOL_VERSION,
+    ):
         self.io = io
         self.sid = sid
+        self.protocol = protocol
 
     async def emit(self, event: str, data: Any):
         await self.io.emit(event, data, to=self.sid)
@@ -46,7 +54,14 @@ class SocketMiddleware(Middleware):
             if sid:
                 session = await self.io.get_session(sid)
                 if session:
-                    context.set("socket", ScopedSocket(self.io, sid))
+                    context.set(
+                        "socket",
+                        ScopedSocket(
+                            self.io,
+                            sid,
+                            session.get("protocol", LEGACY_PROTOCOL_VERSION),
+                        ),
+                    )
                 else:
                     logger.debug("No active session!!!!! %s", self.io.get_session(sid))
             else:
@@ -83,15 +98,21 @@ class BotWebSync:
             query = environ.get("QUERY_STRING", "")
             params = parse_qs(query)
             user_aad_id = params.get("userAadId", [None])[0]
+            protocol = negotiate(params.get("protocol", [None])[0])
 
             if user_aad_id:
                 await self.io.enter_room(sid, user_aad_id)
                 self.user_sid[user_aad_id] = sid
-                await self.io.save_session(sid, {"user_aad_id": user_aad_id})
-                logger.info("User connected: %s", user_aad_id)
-
+                await self.io.save_session(
+                    sid, {"user_aad_id": user_aad_id, "protocol": protocol}
+                )
+                logger.info(
+                    "User connected: %s (protocol v%d)", user_aad_id, protocol
+                )
+
+                socket = ScopedSocket(self.io, sid, protocol)
                 for callback in self.connection_callbacks:
-                    result = callback(user_aad_id, self.io)
+                    result = callback(user_aad_id, socket)
                     if isawaitable(result):
                         await result
             else:
@@ -12,6 +12,7 @@ from browser_use.browser.views import BrowserState
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 
 from browser.session import Session, SessionStepState
+from viewer_protocol import encode_step
 
 
 class BrowserAgent:
@@ -196,16 +197,7 @@ class BrowserAgent:
 
         # Emit to socket if available
         if io:
-            await io.emit(
-                "message",
-                {
-                    "screenshot": step.screenshot,
-                    "action": step.action,
-                    "memory": step.memory,
-                    "next_goal": step.next_goal,
-                    "actions": step.actions,
-                },
-            )
+            await io.emit("message", encode_step(step, io.protocol))
 
     def step_callback(
         self, state: BrowserState, output: AgentOutput, step_number: int
@@ -1,14 +1,22 @@
-from dataclasses import dataclass
+import base64
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionStepState:
     screenshot: str
     action: str  # Current evaluation
     memory: Optional[str] = None
     next_goal: Optional[str] = None
     actions: List[str] = None  # List of planned actions
+    _screenshot_bytes: Optional[bytes] = field(default=None, init=False, repr=False)
+
+    def screenshot_bytes(self) -> Optional[bytes]:
+        """Raw screenshot, decoded on first use and kept for later sends"""
+        if self._screenshot_bytes is None and self.screenshot:
+            self._screenshot_bytes = base64.b64decode(self.screenshot)
+        return self._screenshot_bytes
 
 
 class Session:
@@ -15,3 +15,15 @@ class Config:
     PORT = 3978
     APP_ID = os.environ.get("BOT_ID", "")
     APP_PASSWORD = os.environ.get("BOT_PASSWORD", "")
+
+    # Inbound activity queue used by /api/messages
+    INBOUND_WORKERS = int(os.environ.get("INBOUND_WORKERS", "4"))
+    INBOUND_QUEUE_SIZE = int(os.environ.get("INBOUND_QUEUE_SIZE", "1000"))
+    INBOUND_DEDUP_WINDOW = float(os.environ.get("INBOUND_DEDUP_WINDOW", "300"))
+
+    # Diagnostics. /debug/profile is disabled unless DEBUG_TOKEN is set
+    LOOP_LAG_THRESHOLD_MS = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "200"))
+    DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")
+    PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "30"))
+    # Lower sampling intervals slow down the process being profiled
+    PROFILE_MIN_INTERVAL_MS = float(os.environ.get("PROFILE_MIN_INTERVAL_MS", "10"))
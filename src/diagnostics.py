@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagWatchdog:
+    """Measures event loop lag and logs what the loop was doing when it stalls.
+
+    A task on the loop records a heartbeat every `interval` seconds. A daemon
+    thread checks the heartbeat and, once it is more than `threshold` seconds
+    late, logs the loop thread's current stack. That is the code blocking it.
+    """
+
+    def __init__(self, threshold: float = 0.2, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_lag = 0.0
+        self._heartbeat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            lag = self._heartbeat - expected
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                logger.warning("Event loop lag: %.0f ms", lag * 1000)
+
+    def _watch(self) -> None:
+        reported = False
+        while not self._stopped.wait(self.interval):
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for <= self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            # Report each stall once, with the stack that is holding the loop
+            reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unknown>"
+            logger.warning(
+                "Event loop blocked for over %.0f ms in:\n%s",
+                blocked_for * 1000,
+                stack,
+            )
+
+    def start(self) -> None:
+        """Start watching the running loop. Must be called from the loop thread."""
+        if self._task:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._thread = None
+
+
+def _collapse_stack(thread_name: str, frame: Optional[FrameType]) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    frames.append(thread_name)
+    return ";".join(reversed(frames))
+
+
+def sample_stacks(duration: float, interval: float = 0.01) -> str:
+    """Sample every thread's stack for `duration` seconds.
+
+    Blocks the calling thread, so run it off the event loop. Returns the
+    samples in collapsed-stack format ("frame;frame;frame count" per line),
+    which flamegraph.pl and speedscope read directly.
+    """
+    own_thread_id = threading.get_ident()
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Counter = Counter()
+
+    deadline = time.monotonic() + duration
+    while (remaining := deadline - time.monotonic()) > 0:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            name = thread_names.get(thread_id, f"thread-{thread_id}")
+            counts[_collapse_stack(name, frame)] += 1
+        # Never sleep past the deadline, whatever interval was asked for
+        time.sleep(min(interval, remaining))
+
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
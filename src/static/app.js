@@ -4,6 +4,40 @@ let selectedMessageIndex = null;
 let expandedMessages = new Set();
 let currentGoal = null;
 
+// Viewer protocol version requested from the server. Version 2 sends steps as
+// positional arrays with the screenshot as a binary attachment.
+const PROTOCOL_VERSION = 2;
+const STEP_FIELDS = ["action", "memory", "next_goal", "actions", "screenshot"];
+
+function decodeStep(step) {
+  if (!Array.isArray(step)) {
+    // Version 1: dict with a base64 screenshot
+    return {
+      ...step,
+      screenshotUrl: step.screenshot
+        ? `data:image/png;base64,${step.screenshot}`
+        : null,
+    };
+  }
+
+  const message = {};
+  STEP_FIELDS.forEach((field, i) => {
+    message[field] = step[i];
+  });
+  message.screenshotUrl = message.screenshot
+    ? URL.createObjectURL(new Blob([message.screenshot], { type: "image/png" }))
+    : null;
+  return message;
+}
+
+function releaseMessages() {
+  messages.forEach((message) => {
+    if (message.screenshotUrl?.startsWith("blob:")) {
+      URL.revokeObjectURL(message.screenshotUrl);
+    }
+  });
+}
+
 function updateConnectionStatus(isConnected) {
   const statusDot = document.getElementById("connection-status");
   const statusText = document.getElementById("connection-text");
@@ -131,9 +165,9 @@ function updateScreenshot() {
   if (messages.length > 0) {
     const currentMessage =
       messages[selectedMessageIndex ?? messages.length - 1];
-    if (currentMessage.screenshot) {
+    if (currentMessage.screenshotUrl) {
       container.classList.remove("hidden");
-      img.src = `data:image/png;base64,${currentMessage.screenshot}`;
+      img.src = currentMessage.screenshotUrl;
     }
   }
 }
@@ -191,7 +225,7 @@ function initializeApp() {
 function connectSocket(userId) {
   socket = io("http://localhost:3978", {
     transports: ["websocket"],
-    query: { userAadId: userId },
+    query: { userAadId: userId, protocol: PROTOCOL_VERSION },
   });
 
   socket.on("connect", () => updateConnectionStatus(true));
@@ -199,12 +233,13 @@ function connectSocket(userId) {
 
   socket.on("message", (message) => {
     console.log("Received message:", message);
-    messages.push(message);
+    messages.push(decodeStep(message));
     console.log("Messages array:", messages);
     updateMessages();
   });
 
   socket.on("reset", () => {
+    releaseMessages();
     messages = [];
     currentGoal = null;
     updateMessages();
@@ -212,8 +247,10 @@ function connectSocket(userId) {
   });
 
   socket.on("initializeState", (state) => {
-    if (state.messages && Array.isArray(state.messages)) {
-      messages = state.messages;
+    const steps = state.steps ?? state.messages;
+    if (steps && Array.isArray(steps)) {
+      releaseMessages();
+      messages = steps.map(decodeStep);
       updateMessages();
     }
   });
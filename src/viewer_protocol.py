@@ -0,0 +1,55 @@
+from typing import Any, Iterable, List, Optional
+
+from browser.session import SessionStepState
+
+# Version 1 sends each step as a dict with the screenshot base64 encoded.
+# Version 2 sends each step as a positional list in STEP_FIELDS order, with the
+# screenshot as raw bytes so socket.io ships it as a binary attachment. The
+# bytes are decoded the first time a step is sent and reused after that.
+LEGACY_PROTOCOL_VERSION = 1
+PROTOCOL_VERSION = 2
+SUPPORTED_PROTOCOL_VERSIONS = (LEGACY_PROTOCOL_VERSION, PROTOCOL_VERSION)
+
+STEP_FIELDS = ("action", "memory", "next_goal", "actions", "screenshot")
+
+
+def negotiate(requested: Optional[str]) -> int:
+    """Pick the protocol version to use for a client.
+
+    Clients that don't ask for a version get the legacy protocol.
+    """
+    try:
+        version = int(requested) if requested else LEGACY_PROTOCOL_VERSION
+    except ValueError:
+        return LEGACY_PROTOCOL_VERSION
+    if version > PROTOCOL_VERSION:
+        # Newer clients fall back to the newest version we speak
+        return PROTOCOL_VERSION
+    if version in SUPPORTED_PROTOCOL_VERSIONS:
+        return version
+    return LEGACY_PROTOCOL_VERSION
+
+
+def encode_step(step: SessionStepState, version: int) -> Any:
+    if version >= PROTOCOL_VERSION:
+        return [
+            step.action,
+            step.memory,
+            step.next_goal,
+            step.actions,
+            step.screenshot_bytes(),
+        ]
+    return {
+        "screenshot": step.screenshot,
+        "action": step.action,
+        "memory": step.memory,
+        "next_goal": step.next_goal,
+        "actions": step.actions,
+    }
+
+
+def encode_state(steps: Iterable[SessionStepState], version: int) -> dict:
+    messages: List[Any] = [encode_step(step, version) for step in steps]
+    if version >= PROTOCOL_VERSION:
+        return {"version": version, "steps": messages}
+    return {"messages": messages}